@@ -1,109 +1,204 @@
 import streamlit as st
 import asyncio
-import aiohttp
-import nest_asyncio
+import atexit
+import threading
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
-from openai import OpenAI
+from dataclasses import dataclass
+from io import BytesIO
+from html import escape
+from openai import AsyncOpenAI
 
-# Fix event loop issues
-nest_asyncio.apply()
+from youtube_client import new_session, fetch_youtube_results
+from openai_client import summarize_stream
 
 # Load API keys
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-# --------- Fetch YouTube Search Results ----------
-async def fetch_youtube_results(query, max_results=5):
-    search_url = (
-        f"https://www.googleapis.com/youtube/v3/search?part=snippet&type=video"
-        f"&q={query}&maxResults={max_results}&key={YOUTUBE_API_KEY}"
+# --------- Background Event Loop ----------
+# One loop for the whole server, running in a daemon thread. Coroutines are
+# submitted to it instead of building a new loop per search, so the HTTP
+# session and OpenAI client below keep their connection pools across
+# reruns and users.
+@st.cache_resource
+def get_loop():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+def submit_async(coro):
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+def run_async(coro):
+    return submit_async(coro).result()
+
+async def next_item(agen):
+    return await agen.__anext__()
+
+# Drive an async generator on the background loop, yielding each item back
+# on the script thread where Streamlit elements can be updated
+def iter_async(agen):
+    while True:
+        try:
+            yield run_async(next_item(agen))
+        except StopAsyncIteration:
+            return
+
+async def open_session():
+    return new_session()  # created on the background loop it will run on
+
+@st.cache_resource
+def get_session():
+    loop = get_loop()
+    session = run_async(open_session())
+    atexit.register(lambda: asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout=5))
+    return session
+
+# Async client so concurrent summaries really overlap instead of blocking the loop.
+# SDK retries are off so create_completion's limiter and backoff are the only
+# retry policy (no hidden 429 retries while holding OPENAI_SEM).
+@st.cache_resource
+def get_openai():
+    return AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+
+# --------- Cached Search ----------
+SEARCH_CACHE_TTL = 600  # seconds
+SEARCH_CACHE_ENTRIES = 256
+
+# Repeat searches within 10 minutes reuse the response instead of paying
+# latency and 100 quota units again; the cache is shared by every session
+@st.cache_data(ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_ENTRIES, show_spinner=False)
+def cached_search(query, max_results=5):
+    return run_async(fetch_youtube_results(get_session(), query, max_results))
+
+# Case/whitespace variants of a topic share one cache entry
+def normalize_query(text):
+    return " ".join(text.lower().split())
+
+# --------- Result Card ----------
+# Render-ready strings for one card. Cards are drawn twice (pending, then
+# with the summary), so they are escaped once per video and reused; they
+# live here, not on the search records, which stay plain data.
+@dataclass(slots=True)
+class Card:
+    title_html: str
+    stats_html: str
+    summary_html: str
+    image_url: str  # thumbnails load straight from the YouTube CDN
+
+def prepare_card(v):
+    return Card(
+        title_html=escape(v.title),
+        stats_html=f"Views: {v.views} | Growth: {v.growth}%",
+        summary_html=escape(v.summary) if v.summary is not None else "⏳ Summarizing...",
+        image_url=escape(v.thumbnail),
     )
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(search_url) as resp:
-            if resp.status != 200:
-                text = await resp.text()
-                raise Exception(f"❌ YouTube API error {resp.status}: {text}")
-            data = await resp.json()
-
-    results = []
-    for item in data.get("items", []):
-        video_id = item["id"]["videoId"]
-        title = item["snippet"]["title"]
-        thumbnail = item["snippet"]["thumbnails"]["medium"]["url"]
-        results.append({
-            "id": video_id,
-            "title": title,
-            "thumbnail": thumbnail,
-            "views": int(100000 + (hash(title) % 1000000)),  # fake demo data
-            "growth": round(5 + (hash(video_id) % 30), 2)   # fake demo % growth
-        })
-    return results
-
-# --------- Summarize with AI ----------
-async def summarize_video(title):
-    prompt = f"Summarize why the YouTube video '{title}' could be trending."
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
+# One markdown element per card instead of five separate deltas
+def render_card(slot, card):
+    slot.markdown(
+        f"<small><b>{card.title_html}</b></small><br>"
+        f"<small>{card.summary_html}</small><br>"
+        f"<small>{card.stats_html}</small><br>"
+        f"<img src='{card.image_url}' style='width:100%'/><hr>",
+        unsafe_allow_html=True,
     )
-    return response.choices[0].message.content.strip()
-
-# --------- Async Process ----------
-async def process(query):
-    videos = await fetch_youtube_results(query)
-    summaries = await asyncio.gather(*[summarize_video(v["title"]) for v in videos])
-    for v, s in zip(videos, summaries):
-        v["summary"] = s
-    return videos
-
-# --------- Streamlit App ----------
-st.set_page_config(page_title="YouTube AI Trends", layout="wide")
-
-st.title("📊 YouTube AI Analytics Dashboard")
-st.markdown("<small>AI-powered recommendations & analytics</small>", unsafe_allow_html=True)
 
-query = st.text_input("🔎 Enter a topic to search:", "AI trends")
-
-if st.button("Search"):
-    with st.spinner("Fetching videos..."):
-        videos = asyncio.run(process(query))
+# --------- Charts ----------
+# Drawn and rendered to PNG once per distinct result set; reruns reuse the
+# cached bytes, so neither drawing nor savefig runs again.
+# Plain Figure objects (not pyplot) so nothing stays registered afterwards.
+# matplotlib is imported here, on first use, to keep it off the initial page load.
+def figure_png(fig):
+    buf = BytesIO()
+    fig.savefig(buf, format="png", dpi=200, bbox_inches="tight")
+    return buf.getvalue()
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def growth_chart(titles, growth):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    ax.plot(titles, growth, marker="o", label="Growth %")
+    ax.set_title("Video Growth % (Like YouTube Analytics)", fontsize=12)
+    ax.set_ylabel("Growth %")
+    ax.set_xticklabels(titles, rotation=45, ha="right", fontsize=8)
+    ax.legend()
+    return figure_png(fig)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def views_chart(titles, views):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    ax.bar(titles, views, color="red", alpha=0.7)
+    ax.set_title("Views Comparison", fontsize=12)
+    ax.set_ylabel("Views")
+    ax.set_xticklabels(titles, rotation=45, ha="right", fontsize=8)
+    return figure_png(fig)
+
+# --------- Results ----------
+def render_results(videos):
+    # Results replayed from session state already carry their summaries
+    done = all(v.summary is not None for v in videos)
 
     # Show results side-by-side
     col1, col2 = st.columns([2, 3])
 
+    # Cards render right away; summaries fill in as each batch lands
     with col1:
         st.subheader("💬 AI Recommendations")
-        for v in videos:
-            st.markdown(f"<small>**{v['title']}**</small>", unsafe_allow_html=True)
-            st.markdown(f"<small>{v['summary']}</small>", unsafe_allow_html=True)
-            st.markdown(f"<small>Views: {v['views']} | Growth: {v['growth']}%</small>", unsafe_allow_html=True)
-            st.image(v["thumbnail"], use_container_width=True)
-            st.markdown("---")
+        slots = [st.empty() for _ in videos]
+        cards = [prepare_card(v) for v in videos]
+        for slot, card in zip(slots, cards):
+            render_card(slot, card)
 
     with col2:
         st.subheader("📈 Analytics (Demo Data)")
 
-        # Create DataFrame for chart
-        df = pd.DataFrame(videos)
+        # Chart columns straight from the records; tuples so they hash as
+        # cache keys for the chart builders
+        titles = tuple(v.title for v in videos)
 
         # Line chart: Growth %
-        fig, ax = plt.subplots(figsize=(6, 4))
-        ax.plot(df["title"], df["growth"], marker="o", label="Growth %")
-        ax.set_title("Video Growth % (Like YouTube Analytics)", fontsize=12)
-        ax.set_ylabel("Growth %")
-        ax.set_xticklabels(df["title"], rotation=45, ha="right", fontsize=8)
-        ax.legend()
-        st.pyplot(fig)
+        st.image(growth_chart(titles, tuple(v.growth for v in videos)))
 
         # Bar chart: Views
-        fig2, ax2 = plt.subplots(figsize=(6, 4))
-        ax2.bar(df["title"], df["views"], color="red", alpha=0.7)
-        ax2.set_title("Views Comparison", fontsize=12)
-        ax2.set_ylabel("Views")
-        ax2.set_xticklabels(df["title"], rotation=45, ha="right", fontsize=8)
-        st.pyplot(fig2)
+        st.image(views_chart(titles, tuple(v.views for v in videos)))
+
+    if done:
+        return
+    for batch in iter_async(summarize_stream(get_openai(), videos)):
+        for i, summary in batch:
+            videos[i].summary = summary
+            cards[i].summary_html = escape(summary)
+            render_card(slots[i], cards[i])
+
+# --------- Streamlit App ----------
+def main():
+    st.set_page_config(page_title="YouTube AI Trends", layout="wide")
+
+    st.title("📊 YouTube AI Analytics Dashboard")
+    st.markdown("<small>AI-powered recommendations & analytics</small>", unsafe_allow_html=True)
+
+    # A form only reruns the script on submit, not on every edit/blur of the input
+    with st.form("search"):
+        query = normalize_query(st.text_input("🔎 Enter a topic to search:", "AI trends"))
+        submitted = st.form_submit_button("Search")
+
+    if submitted:
+        # Re-submitting the same query replays the finished results instead
+        # of running the search and summaries again
+        last = st.session_state.get("last")
+        if last and last["query"] == query:
+            videos = last["videos"]
+        else:
+            with st.spinner("Fetching videos..."):
+                videos = cached_search(query)
+
+        render_results(videos)
+        st.session_state["last"] = {"query": query, "videos": videos}
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import os
+import re
+import time
+import random
+import asyncio
+import hashlib
+import sqlite3
+from collections import deque
+
+import orjson
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+SUMMARY_MODEL = "gpt-4o-mini"
+SUMMARY_MAX_TOKENS = 120  # per video; output tokens dominate request latency
+SUMMARY_TEMPERATURE = 0.3
+SUMMARY_CACHE_PATH = os.path.expanduser("~/.cache/ytai.db")
+SUMMARY_CACHE_TTL = 86400  # seconds
+
+# Account limits, shared by every session on this server
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", 8))
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", 500))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", 200000))
+OPENAI_MAX_ATTEMPTS = 5  # the client is built with max_retries=0, so this is the only retry loop
+
+OPENAI_SEM = asyncio.Semaphore(OPENAI_CONCURRENCY)  # cap in-flight OpenAI requests
+_recent_requests = deque()  # (monotonic time, estimated tokens) over the last minute
+_summary_db = None  # opened on first use, on the background loop's thread
+
+_URL_RE = re.compile(r"https?://\S+")
+_WS_RE = re.compile(r"\s+")
+
+# 🔹 Description as sent to the model: links dropped, whitespace collapsed,
+# capped at n characters (descriptions are mostly link blocks and hashtags)
+def short_desc(text, n=400):
+    return _WS_RE.sub(" ", _URL_RE.sub("", text or "")).strip()[:n]
+
+# 🔹 Summary cache
+# Summaries only depend on the prompt fields, so they are shared across
+# queries, reruns and sessions through a small SQLite file. It runs on the
+# shared event loop, so there is one connection, one read per result list
+# and one commit per summarized chunk. Expired rows (and rows left behind
+# by older key formats) are deleted each time the connection is opened.
+def summary_cache():
+    global _summary_db
+    if _summary_db is None:
+        os.makedirs(os.path.dirname(SUMMARY_CACHE_PATH), exist_ok=True)
+        conn = sqlite3.connect(SUMMARY_CACHE_PATH, check_same_thread=False)
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "key TEXT PRIMARY KEY, video_id TEXT, summary TEXT, created_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS summaries_created_at ON summaries (created_at)")
+            conn.execute(
+                "DELETE FROM summaries WHERE created_at <= ?",
+                (time.time() - SUMMARY_CACHE_TTL,),
+            )
+        _summary_db = conn
+    return _summary_db
+
+def summary_key(video):
+    fields = (
+        f"{SUMMARY_MODEL}|{video.id}|{video.title}"
+        f"|{video.channel}|{short_desc(video.description)}"
+    )
+    return hashlib.sha256(fields.encode("utf-8")).hexdigest()
+
+# key -> summary for every fresh entry among keys
+def get_cached_summaries(keys):
+    if not keys:
+        return {}
+    placeholders = ",".join("?" * len(keys))
+    rows = summary_cache().execute(
+        f"SELECT key, summary FROM summaries WHERE key IN ({placeholders}) AND created_at > ?",
+        (*keys, time.time() - SUMMARY_CACHE_TTL),
+    ).fetchall()
+    return dict(rows)
+
+# rows: (key, video_id, summary) tuples, written in a single transaction
+def store_summaries(rows):
+    now = time.time()
+    with summary_cache() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+            [(key, video_id, summary, now) for key, video_id, summary in rows],
+        )
+
+# 🔹 Rate limiting
+# Sliding one-minute window over requests and tokens: wait for budget up
+# front instead of tripping 429s and retrying in a storm.
+async def wait_for_budget(tokens):
+    while True:
+        now = time.monotonic()
+        while _recent_requests and now - _recent_requests[0][0] >= 60:
+            _recent_requests.popleft()
+        used = sum(t for _, t in _recent_requests)
+        if not _recent_requests or (
+            len(_recent_requests) < OPENAI_RPM and used + tokens <= OPENAI_TPM
+        ):
+            _recent_requests.append((now, tokens))
+            return
+        await asyncio.sleep(60 - (now - _recent_requests[0][0]))
+
+async def create_completion(client, **kwargs):
+    # ~4 characters per prompt token, plus the completion budget
+    tokens = sum(len(m["content"]) for m in kwargs["messages"]) // 4 + kwargs.get("max_tokens", 0)
+    for attempt in range(OPENAI_MAX_ATTEMPTS):
+        async with OPENAI_SEM:
+            await wait_for_budget(tokens)
+            try:
+                return await client.chat.completions.create(model=SUMMARY_MODEL, **kwargs)
+            except (RateLimitError, APIConnectionError, InternalServerError):
+                if attempt == OPENAI_MAX_ATTEMPTS - 1:
+                    raise
+        # 429s, dropped connections and 5xx: exponential backoff with
+        # jitter, outside the semaphore, and back through the budget
+        await asyncio.sleep(random.uniform(0.5, 2) * 2 ** attempt)
+
+# 🔹 Summarize one video
+async def summarize_video(client, title):
+    prompt = f"Summarize why the YouTube video '{title}' could be trending."
+    response = await create_completion(
+        client,
+        max_tokens=SUMMARY_MAX_TOKENS,
+        temperature=SUMMARY_TEMPERATURE,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    return response.choices[0].message.content.strip()
+
+def build_batch_prompt(videos):
+    lines = "\n".join(
+        f"{i}. {v.id}|{v.title}|{v.channel}|{short_desc(v.description)}"
+        for i, v in enumerate(videos, 1)
+    )
+    return (
+        "For each YouTube video below (id|title|channel|description), "
+        "summarize in 1-2 sentences why it could be trending.\n"
+        f"{lines}\n"
+        'Return a JSON object {"results":[{"id":..,"summary":..}]} '
+        "with one entry per video."
+    )
+
+# 🔹 Summarize a whole result list in one request
+async def summarize_videos(client, videos):
+    response = await create_completion(
+        client,
+        response_format={"type": "json_object"},
+        max_tokens=SUMMARY_MAX_TOKENS * len(videos),
+        temperature=SUMMARY_TEMPERATURE,
+        messages=[{"role": "user", "content": build_batch_prompt(videos)}],
+    )
+    parsed = orjson.loads(response.choices[0].message.content)
+    by_id = {r["id"]: r["summary"].strip() for r in parsed["results"]}
+    return [by_id[v.id] for v in videos]
+
+# 🔹 Summarize a chunk of uncached videos and store the results
+async def summarize_chunk(client, videos):
+    try:
+        summaries = await summarize_videos(client, videos)
+    except (orjson.JSONDecodeError, KeyError, TypeError, AttributeError):
+        # Malformed batch reply: fall back to one request per video
+        summaries = await asyncio.gather(*[summarize_video(client, v.title) for v in videos])
+
+    store_summaries([(summary_key(v), v.id, s) for v, s in zip(videos, summaries)])
+    return summaries
+
+# 🔹 Yield [(index, summary), ...] as soon as each group is ready: cached
+# summaries first, then uncached videos in concurrent batches of batch_size
+async def summarize_stream(client, videos, batch_size=4):
+    keys = [summary_key(v) for v in videos]
+    found = get_cached_summaries(keys)
+    cached = [found.get(k) for k in keys]
+    hits = [(i, s) for i, s in enumerate(cached) if s is not None]
+    if hits:
+        yield hits
+
+    missing = [i for i, s in enumerate(cached) if s is None]
+    chunks = [missing[n:n + batch_size] for n in range(0, len(missing), batch_size)]
+    # A straggler batch pays a full request for one or two videos; fold it
+    # into the previous batch instead (e.g. 5 videos -> one request, not 4 + 1)
+    if len(chunks) > 1 and len(chunks[-1]) < batch_size // 2 + 1:
+        chunks[-2:] = [chunks[-2] + chunks[-1]]
+
+    async def run(chunk):
+        summaries = await summarize_chunk(client, [videos[i] for i in chunk])
+        return list(zip(chunk, summaries))
+
+    for done in asyncio.as_completed([run(chunk) for chunk in chunks]):
+        yield await done
@@ -1,68 +1,116 @@
-import os
-import aiohttp
 import asyncio
-import datetime
-
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")  # make sure this is set in Streamlit secrets
-
-# 🔹 Fetch recent videos for a keyword/topic
-async def fetch_recent_videos(query="trending", max_results=10):
-    url = (
-        f"https://www.googleapis.com/youtube/v3/search"
-        f"?part=snippet&type=video&order=date&maxResults={max_results}"
-        f"&q={query}&key={YOUTUBE_API_KEY}"
-    )
-
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-            if resp.status != 200:
-                text = await resp.text()
-                raise Exception(f"❌ YouTube API error {resp.status}: {text}")
-            return await resp.json()
-
-# 🔹 Get video stats (views, likes, etc.)
-async def fetch_video_stats(video_id):
-    url = (
-        f"https://www.googleapis.com/youtube/v3/videos"
-        f"?part=statistics&id={video_id}&key={YOUTUBE_API_KEY}"
-    )
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-            data = await resp.json()
-            stats = data["items"][0]["statistics"]
-            return {
-                "views": int(stats.get("viewCount", 0)),
-                "likes": int(stats.get("likeCount", 0)),
-                "comments": int(stats.get("commentCount", 0)),
-            }
-
-# 🔹 Simple trend score = views ÷ (1 + hours since published)
-def calculate_trend_score(views, published_at):
-    published_time = datetime.datetime.fromisoformat(published_at.replace("Z", "+00:00"))
-    hours_since = max((datetime.datetime.now(datetime.timezone.utc) - published_time).total_seconds() / 3600, 1)
-    return round(views / hours_since, 2)
-
-# 🔹 Main trend detection
+from html import unescape
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from youtube_client import SEARCH_URL, VIDEOS_URL, new_session, http_json
+
+SEARCH_PAGE_SIZE = 50  # search.list returns at most 50 results per page
+
+# 🔹 Fetch recent videos for a keyword/topic, yielding each page of items
+# as it arrives (max_results above 50 spans several pages)
+async def fetch_recent_videos(session, query="trending", max_results=10):
+    params = {
+        "part": "snippet",
+        "type": "video",
+        "order": "date",
+        "q": query,
+        "fields": "nextPageToken,items(id/videoId,snippet(title,publishedAt,thumbnails/medium/url))",
+    }
+    remaining = max_results
+    while remaining > 0:
+        params["maxResults"] = min(remaining, SEARCH_PAGE_SIZE)
+        data = await http_json(session, SEARCH_URL, params)
+        items = data.get("items", [])
+        if items:
+            yield items
+        remaining -= len(items)
+        params["pageToken"] = data.get("nextPageToken")
+        if not items or not params["pageToken"]:
+            return
+
+STATS_BATCH_SIZE = 50  # videos.list accepts up to 50 ids per call
+STATS_CONCURRENCY = 8  # in-flight videos.list calls; keeps bursts under rate limits
+
+# 🔹 Get video stats (views, likes, etc.) for up to 50 ids in one call
+async def fetch_video_stats(session, video_ids):
+    data = await http_json(session, VIDEOS_URL, {
+        "part": "statistics",
+        "id": ",".join(video_ids),
+        "fields": "items(id,statistics(viewCount,likeCount,commentCount))",
+    })
+    return {
+        item["id"]: {
+            "views": int(item["statistics"].get("viewCount", 0)),
+            "likes": int(item["statistics"].get("likeCount", 0)),
+            "comments": int(item["statistics"].get("commentCount", 0)),
+        }
+        for item in data.get("items", ())
+    }
+
+def batched(items, size):
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+# 🔹 Simple trend score = views ÷ (1 + hours since published), for all videos at once
+def calculate_trend_scores(views, published_at, now=None):
+    now = now or pd.Timestamp.now(tz="UTC")
+    published = pd.to_datetime(published_at, utc=True)
+    hours_since = np.maximum((now - published).total_seconds().to_numpy() / 3600, 1.0)
+    return np.round(np.asarray(views, dtype=np.float64) / hours_since, 2)
+
+# 🔹 Main trend detection (one pooled session, so the search and every
+# stats call share keep-alive connections to googleapis.com)
 async def detect_trends(query="trending", max_results=10):
-    results = await fetch_recent_videos(query, max_results)
-    tasks = []
-    videos = []
+    async with new_session(limit=10, limit_per_host=10) as session:
+        sem = asyncio.Semaphore(STATS_CONCURRENCY)
+
+        async def stats_for(chunk):
+            async with sem:
+                return await fetch_video_stats(session, chunk)
+
+        videos = []
+        stats_tasks = []
 
-    for item in results["items"]:
-        video_id = item["id"]["videoId"]
-        title = item["snippet"]["title"]
-        published_at = item["snippet"]["publishedAt"]
-        thumbnail = item["snippet"]["thumbnails"]["medium"]["url"]
+        try:
+            async for items in fetch_recent_videos(session, query, max_results):
+                page = [
+                    {
+                        "id": item["id"]["videoId"],
+                        "title": unescape(item["snippet"]["title"]),  # sent HTML-escaped
+                        "published_at": item["snippet"]["publishedAt"],
+                        "thumbnail": item["snippet"]["thumbnails"]["medium"]["url"],
+                    }
+                    for item in items
+                ]
+                videos.extend(page)
 
-        tasks.append(fetch_video_stats(video_id))
-        videos.append({"id": video_id, "title": title, "published_at": published_at, "thumbnail": thumbnail})
+                # One videos.list call per 50 ids, started right away so it runs
+                # while the next search page is still downloading
+                for chunk in batched([v["id"] for v in page], STATS_BATCH_SIZE):
+                    stats_tasks.append(asyncio.ensure_future(stats_for(chunk)))
 
-    stats_list = await asyncio.gather(*tasks)
+            stats_maps = await asyncio.gather(*stats_tasks)
+        except BaseException:
+            # A failed page or stats call: stop the other stats calls and
+            # collect them before the session closes underneath them
+            for task in stats_tasks:
+                task.cancel()
+            await asyncio.gather(*stats_tasks, return_exceptions=True)
+            raise
+    stats_by_id = {k: stats for m in stats_maps for k, stats in m.items()}
 
-    # Attach stats + trend score
-    for i, stats in enumerate(stats_list):
-        videos[i].update(stats)
-        videos[i]["trend_score"] = calculate_trend_score(stats["views"], videos[i]["published_at"])
+    # Attach stats + trend scores (one vectorized pass, one shared "now")
+    missing = {"views": 0, "likes": 0, "comments": 0}  # removed/private videos
+    stats_list = [stats_by_id.get(v["id"], missing) for v in videos]
+    views = np.fromiter((s["views"] for s in stats_list), dtype=np.int64, count=len(stats_list))
+    scores = calculate_trend_scores(views, [v["published_at"] for v in videos])
+    for video, stats, score in zip(videos, stats_list, scores.tolist()):
+        video.update(stats)
+        video["trend_score"] = score
 
     # Sort by trend score (highest first)
     return sorted(videos, key=lambda x: x["trend_score"], reverse=True)